@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the generators and mutators in this repo.
+
+Builds its own inputs (a tiny ffmpeg-generated MP4, a sparse 1 GB MP4 and a large Lorem Ipsum text), runs each
+benchmark in a separate worker process so peak RSS is per benchmark, and writes the results to JSON. The compare
+command flags regressions against a stored baseline.
+"""
+
+import argparse
+import contextlib
+import csv
+import datetime
+import importlib.util
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+
+import ffmpeg_runner
+import lorem
+import mp4_datetime_fuzzer
+import scatter_bytes
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# metrics where a smaller number is better, everything else is a throughput
+LOWER_IS_BETTER = {"peak_rss_mb", "seconds"}
+
+class BenchmarkSkipped(Exception):
+    pass
+
+def load_script(filename):
+    """Import one of the hyphenated scripts as a module."""
+    name = os.path.splitext(filename)[0].replace("-", "_")
+    spec = importlib.util.spec_from_file_location(name, os.path.join(HERE, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def box(box_type, payload):
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+def full_box(box_type, payload_size):
+    # version 0, flags 0, the fuzzers only look at the version byte
+    return box(box_type, b"\0" * payload_size)
+
+def build_mp4(path, size, sparse=True):
+    """
+    Write a minimal MP4 of the given size. With sparse, the mdat is a hole, so the file is large on paper but cheap on
+    disk. Otherwise the mdat is written out so every block is allocated.
+    """
+    stbl = box(b"stbl", full_box(b"stts", 16) + full_box(b"stsz", 12) + full_box(b"stco", 8))
+    trak = box(b"trak", full_box(b"tkhd", 84) + box(b"mdia", full_box(b"mdhd", 24) + box(b"minf", stbl)))
+    moov = box(b"moov", full_box(b"mvhd", 100) + trak)
+    header = box(b"ftyp", b"isom\0\0\x02\0isomiso2mp41") + moov
+    mdat_size = size - len(header)
+    with open(path, "wb") as f:
+        f.write(header)
+        f.write(struct.pack(">I4sQ", 1, b"mdat", mdat_size))
+        if sparse:
+            f.truncate(size)
+            return
+        remaining = size - f.tell()
+        block = b"\x11" * (1 << 20)
+        while remaining > 0:
+            remaining -= f.write(block[:remaining])
+
+def build_tiny_mp4(path):
+    ffmpeg_runner.run_ffmpeg([
+        "-y", "-f", "lavfi", "-i", "testsrc=size=320x240:rate=30:duration=2",
+        "-pix_fmt", "yuv420p", "-c:v", ffmpeg_runner.resolve_encoder("libx264"),
+        path
+    ], quiet=True)
+
+def input_paths(workdir):
+    return {
+        "sparse_mp4": os.path.join(workdir, "sparse.mp4"),
+        "lorem_txt": os.path.join(workdir, "lorem.txt"),
+        "tiny_mp4": os.path.join(workdir, "tiny.mp4"),
+    }
+
+def build_inputs(workdir, args):
+    inputs = input_paths(workdir)
+    if not os.path.exists(inputs["sparse_mp4"]):
+        build_mp4(inputs["sparse_mp4"], args.sparse_mb << 20)
+    if not os.path.exists(inputs["lorem_txt"]):
+        with open(inputs["lorem_txt"], "wb") as f:
+            lorem.write_lorem_bytes(f, args.text_mb << 20, seed=1)
+    if not os.path.exists(inputs["tiny_mp4"]):
+        try:
+            build_tiny_mp4(inputs["tiny_mp4"])
+        except (OSError, subprocess.CalledProcessError, RuntimeError) as e:
+            print(f"WARNING: could not build tiny MP4, ffmpeg benchmarks will be skipped: {e}")
+    return inputs
+
+def require_file(path):
+    if not os.path.exists(path):
+        raise BenchmarkSkipped(f"missing input {os.path.basename(path)}")
+
+def require_ffmpeg():
+    if not shutil.which(ffmpeg_runner.find_ffmpeg()):
+        raise BenchmarkSkipped("ffmpeg not found")
+
+# -----------------------
+# Benchmarks
+# -----------------------
+# Each takes (inputs, scratch directory, options) and returns a dict of metrics.
+
+def bench_lorem(inputs, scratch, opts):
+    target = opts.text_mb << 20
+    start = time.perf_counter()
+    total = sum(len(block) for block in lorem.generate_lorem(target, seed=1))
+    elapsed = time.perf_counter() - start
+    return {"seconds": elapsed, "mb_per_s": total / (1 << 20) / elapsed}
+
+def _bench_datetime_fuzzer(source, scratch, count):
+    fuzz_args = argparse.Namespace(dry_run=False, hash=False, signed=False, min_value=0,
+                                   max_value=0xFFFFFFFFFFFFFFFF, value_mode="random")
+    atoms = [b"mvhd", b"tkhd", b"mdhd", b"stts", b"elst", b"edts"]
+    positions = mp4_datetime_fuzzer.find_atom_positions(source, atoms, 32, "both")
+    size = os.path.getsize(source)
+    random.seed(1)
+
+    start = time.perf_counter()
+    with open(os.devnull, "w", newline="") as devnull:
+        writer = csv.writer(devnull)
+        for idx in range(count):
+            out_path = os.path.join(scratch, f"fuzz_{idx:03d}.mp4")
+            mp4_datetime_fuzzer.create_fuzzed_file(source, out_path, positions, idx, 20, writer, fuzz_args)
+            os.unlink(out_path)
+    elapsed = time.perf_counter() - start
+    return {"seconds": elapsed, "variants_per_s": count / elapsed, "mb_per_s": count * size / (1 << 20) / elapsed}
+
+def bench_datetime_fuzzer_tiny(inputs, scratch, opts):
+    require_file(inputs["tiny_mp4"])
+    return _bench_datetime_fuzzer(inputs["tiny_mp4"], scratch, opts.variants)
+
+def bench_datetime_fuzzer_sparse(inputs, scratch, opts):
+    return _bench_datetime_fuzzer(inputs["sparse_mp4"], scratch, opts.large_variants)
+
+def _bench_scatter(inputs, scratch, opts, regions):
+    # a small allocated file, writes into a sparse one would mostly time the filesystem allocating blocks
+    target = os.path.join(scratch, "scatter.mp4")
+    build_mp4(target, opts.scatter_mb << 20, sparse=False)
+    targets = scatter_bytes.build_targets(target, regions) if regions else None
+    random.seed(1)
+
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        scatter_bytes.modify_file_randomly(target, b"\x00\xff", 4, opts.mutations, 0, targets)
+    elapsed = time.perf_counter() - start
+    return {"seconds": elapsed, "mutations_per_s": opts.mutations / elapsed}
+
+def bench_scatter_uniform(inputs, scratch, opts):
+    return _bench_scatter(inputs, scratch, opts, None)
+
+def bench_scatter_regions(inputs, scratch, opts):
+    return _bench_scatter(inputs, scratch, opts, [("moov/trak/mdia/minf/stbl/*", 90.0), ("mdat", 10.0)])
+
+def bench_text_to_image(inputs, scratch, opts):
+    try:
+        text_to_image = load_script("text-to-image.py")
+    except ImportError as e:
+        raise BenchmarkSkipped(str(e))
+    with open(inputs["lorem_txt"], "r", encoding="ascii") as f:
+        text = f.read(opts.image_text_kb << 10)
+
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        text_to_image.generate_images(text, 32, "white", "black", 1280, 720, 10, scratch)
+    elapsed = time.perf_counter() - start
+    pages = len([name for name in os.listdir(scratch) if name.endswith(".png")])
+    return {"seconds": elapsed, "pages_per_s": pages / elapsed}
+
+def bench_video_high_scene_rate(inputs, scratch, opts):
+    require_ffmpeg()
+    frames_per_scene = 10
+    scenes = opts.scenes
+    start = time.perf_counter()
+    subprocess.run([sys.executable, os.path.join(HERE, "video-high-scene-rate.py"),
+                    "--output", "scenes.mp4", "--mixed-scenes",
+                    "--total_frames", str(scenes * frames_per_scene), "--frames_per_scene", str(frames_per_scene)],
+                   cwd=scratch, check=True, stdout=subprocess.DEVNULL)
+    elapsed = time.perf_counter() - start
+    return {"seconds": elapsed, "scenes_per_s": scenes / elapsed}
+
+def bench_text_to_video(inputs, scratch, opts):
+    require_ffmpeg()
+    with open(inputs["lorem_txt"], "r", encoding="ascii") as f:
+        text = f.read(512)
+    start = time.perf_counter()
+    subprocess.run([sys.executable, os.path.join(HERE, "text-to-video.py"),
+                    "--duration", "2", "--output", "text.mp4", text],
+                   cwd=scratch, check=True, stdout=subprocess.DEVNULL)
+    elapsed = time.perf_counter() - start
+    return {"seconds": elapsed, "videos_per_s": 1 / elapsed}
+
+BENCHMARKS = {
+    "lorem": bench_lorem,
+    "datetime_fuzzer_tiny": bench_datetime_fuzzer_tiny,
+    "datetime_fuzzer_sparse": bench_datetime_fuzzer_sparse,
+    "scatter_uniform": bench_scatter_uniform,
+    "scatter_regions": bench_scatter_regions,
+    "text_to_image": bench_text_to_image,
+    "video_high_scene_rate": bench_video_high_scene_rate,
+    "text_to_video": bench_text_to_video,
+}
+
+# -----------------------
+# Running
+# -----------------------
+
+def peak_rss_mb(who):
+    rss = resource.getrusage(who).ru_maxrss
+    # bytes on macOS, kilobytes everywhere else
+    return rss / (1 << 20) if platform.system() == "Darwin" else rss / 1024
+
+def run_worker(name, inputs, opts):
+    """Run one benchmark in this process and print its metrics as JSON."""
+    scratch = tempfile.mkdtemp(prefix=f"bench_{name}_", dir=opts.workdir)
+    try:
+        metrics = BENCHMARKS[name](inputs, scratch, opts)
+        metrics["peak_rss_mb"] = max(peak_rss_mb(resource.RUSAGE_SELF), peak_rss_mb(resource.RUSAGE_CHILDREN))
+    except BenchmarkSkipped as e:
+        metrics = {"skipped": str(e)}
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    print(json.dumps(metrics))
+
+def run_in_subprocess(name, opts):
+    cmd = [sys.executable, os.path.abspath(__file__), "run", "--worker", name, "--workdir", opts.workdir]
+    for option in SIZE_OPTIONS:
+        cmd += [f"--{option.replace('_', '-')}", str(getattr(opts, option))]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        return {"error": result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f"exit {result.returncode}"}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def best_of(runs):
+    """Keep the best value of each metric over repeated runs."""
+    good = [r for r in runs if "skipped" not in r and "error" not in r]
+    if not good:
+        return runs[-1]
+    best = {}
+    for metric in good[0]:
+        values = [r[metric] for r in good]
+        best[metric] = min(values) if metric in LOWER_IS_BETTER else max(values)
+    return best
+
+def format_metrics(metrics):
+    if "skipped" in metrics:
+        return f"skipped ({metrics['skipped']})"
+    if "error" in metrics:
+        return f"ERROR ({metrics['error']})"
+    return ", ".join(f"{k}={v:.2f}" for k, v in metrics.items())
+
+def command_run(opts):
+    if opts.repeat < 1:
+        sys.exit("--repeat must be at least 1")
+    names = opts.only or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            sys.exit(f"Unknown benchmark '{name}', choose from: {', '.join(BENCHMARKS)}")
+
+    keep_workdir = opts.workdir is not None
+    opts.workdir = os.path.abspath(opts.workdir or tempfile.mkdtemp(prefix="video_fuzzing_bench_"))
+    os.makedirs(opts.workdir, exist_ok=True)
+
+    try:
+        if opts.worker:
+            run_worker(opts.worker, input_paths(opts.workdir), opts)
+            return
+
+        print(f"Building inputs in {opts.workdir}")
+        build_inputs(opts.workdir, opts)
+
+        results = {}
+        for name in names:
+            results[name] = best_of([run_in_subprocess(name, opts) for _ in range(opts.repeat)])
+            print(f"{name}: {format_metrics(results[name])}")
+    finally:
+        if not keep_workdir and not opts.worker:
+            shutil.rmtree(opts.workdir, ignore_errors=True)
+
+    report = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "options": {option: getattr(opts, option) for option in SIZE_OPTIONS},
+        "benchmarks": results,
+    }
+    with open(opts.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {opts.output}")
+
+def compare_results(baseline, current, threshold):
+    """
+    Return (rows, regressions), a metric regresses when it is worse than the baseline by more than threshold %.
+
+    A metric the baseline has but the current run lacks, because the benchmark is missing, errored or was skipped,
+    also counts as a regression.
+    """
+    rows = []
+    regressions = []
+    for name, base_metrics in baseline["benchmarks"].items():
+        metrics = current["benchmarks"].get(name)
+        if metrics is None:
+            missing = "missing"
+        elif "error" in metrics:
+            missing = f"error: {metrics['error']}"
+        elif "skipped" in metrics:
+            missing = f"skipped: {metrics['skipped']}"
+        else:
+            missing = "metric missing"
+        metrics = metrics or {}
+        for metric, base_value in base_metrics.items():
+            if not isinstance(base_value, (int, float)):
+                continue
+            value = metrics.get(metric)
+            if not isinstance(value, (int, float)):
+                rows.append((name, metric, base_value, None, None, missing))
+                regressions.append((name, metric))
+                continue
+            if base_value == 0:
+                continue
+            change = (value - base_value) / base_value * 100
+            worse = -change if metric not in LOWER_IS_BETTER else change
+            regressed = worse > threshold
+            rows.append((name, metric, base_value, value, change, "REGRESSION" if regressed else ""))
+            if regressed:
+                regressions.append((name, metric))
+    return rows, regressions
+
+def command_compare(opts):
+    with open(opts.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(opts.current, "r", encoding="utf-8") as f:
+        current = json.load(f)
+
+    if baseline.get("options") != current.get("options"):
+        print("WARNING: the results were produced with different sizes, comparisons may be meaningless")
+
+    rows, regressions = compare_results(baseline, current, opts.threshold)
+    for name, metric, base_value, value, change, note in rows:
+        if value is None:
+            print(f"{name:<24} {metric:<16} {base_value:>12.2f} {'-':>12} {'-':>9}  REGRESSION ({note})")
+        else:
+            flag = f"  {note}" if note else ""
+            print(f"{name:<24} {metric:<16} {base_value:>12.2f} {value:>12.2f} {change:>+8.1f}%{flag}")
+
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {opts.threshold}%")
+        sys.exit(1)
+    print("No regressions")
+
+SIZE_OPTIONS = ["sparse_mb", "scatter_mb", "text_mb", "variants", "large_variants", "mutations", "image_text_kb", "scenes"]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the generators and mutators in this repo.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run benchmarks and write the results to JSON")
+    run_parser.add_argument("--output", "-o", default="benchmark.json", help="JSON file for the results")
+    run_parser.add_argument("--only", nargs="+", help=f"Benchmarks to run: {', '.join(BENCHMARKS)}")
+    run_parser.add_argument("--repeat", type=int, default=3,
+                            help="Run each benchmark this many times and keep the best, so noise does not show up as a "
+                                 "regression (default: 3)")
+    run_parser.add_argument("--workdir", help="Directory for generated inputs, kept after the run (default: temporary)")
+    run_parser.add_argument("--sparse-mb", type=int, default=1024, help="Size of the sparse MP4 in MB")
+    run_parser.add_argument("--scatter-mb", type=int, default=16, help="Size of the allocated MP4 for byte scattering in MB")
+    run_parser.add_argument("--text-mb", type=int, default=64, help="Size of the Lorem Ipsum text in MB")
+    run_parser.add_argument("--variants", type=int, default=200, help="Fuzzed variants of the tiny MP4")
+    run_parser.add_argument("--large-variants", type=int, default=3, help="Fuzzed variants of the sparse MP4")
+    run_parser.add_argument("--mutations", type=int, default=100000, help="Byte scatter mutations")
+    run_parser.add_argument("--image-text-kb", type=int, default=256, help="KB of text to render as images")
+    run_parser.add_argument("--scenes", type=int, default=30, help="Scenes for the video-high-scene-rate benchmark")
+    run_parser.add_argument("--worker", help=argparse.SUPPRESS)
+
+    compare_parser = subparsers.add_parser("compare", help="Flag regressions against a baseline")
+    compare_parser.add_argument("baseline", help="Baseline results JSON")
+    compare_parser.add_argument("current", help="New results JSON")
+    compare_parser.add_argument("--threshold", type=float, default=10.0,
+                                help="Percent worse than the baseline that counts as a regression (default: 10)")
+
+    opts = parser.parse_args()
+    if opts.command == "run":
+        command_run(opts)
+    else:
+        command_compare(opts)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Shared ffmpeg runner for the video tools.
+
+Resolves the ffmpeg binary once, probes its encoders, filters and demuxers once (cached on disk, keyed by binary
+path and mtime), falls back to an available encoder when the requested one is missing, and limits how many ffmpeg
+children run at the same time.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import threading
+import time
+from functools import lru_cache
+
+# homebrew has extra features we use in ffmpeg-full
+FFMPEG_FULL = "/opt/homebrew/opt/ffmpeg-full/bin/ffmpeg"
+
+CACHE_FILE = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+                          "video-fuzzing", "ffmpeg-capabilities.json")
+
+ENCODER_FALLBACKS = {
+    "h264_videotoolbox": ["libx264"],
+    "hevc_videotoolbox": ["libx265", "libx264"],
+    "libx265": ["libx264"],
+    "libx264": ["libopenh264", "h264_videotoolbox"],
+}
+
+def _max_jobs():
+    default = os.cpu_count() or 1
+    value = os.environ.get("FFMPEG_JOBS")
+    if not value:
+        return default
+    try:
+        jobs = int(value)
+    except ValueError:
+        print(f"WARNING: FFMPEG_JOBS='{value}' is not a number, using {default}")
+        return default
+    if jobs < 1:
+        print("WARNING: FFMPEG_JOBS must be at least 1, using 1")
+        return 1
+    return jobs
+
+MAX_JOBS = _max_jobs()
+_job_slots = threading.BoundedSemaphore(MAX_JOBS)
+
+# (command, seconds) for every ffmpeg run in this process
+timings = []
+
+@lru_cache(maxsize=None)
+def find_ffmpeg():
+    if os.path.exists(FFMPEG_FULL):
+        return FFMPEG_FULL
+    return shutil.which("ffmpeg") or "ffmpeg"
+
+def _parse_names(output, header):
+    """Pull the name column out of `ffmpeg -encoders/-filters/-demuxers` listings."""
+    names = set()
+    in_table = False
+    for line in output.splitlines():
+        if not in_table:
+            in_table = line.strip() == header
+            continue
+        fields = line.split()
+        # skip the flag legend and the dashed separator
+        if len(fields) < 2 or fields[1] == "=":
+            continue
+        names.update(fields[1].split(","))
+    return names
+
+def _probe(ffmpeg):
+    capabilities = {}
+    for kind, header in (("encoders", "Encoders:"), ("filters", "Filters:"), ("demuxers", "File formats:")):
+        result = subprocess.run([ffmpeg, "-hide_banner", f"-{kind}"],
+                                capture_output=True, text=True, check=True)
+        capabilities[kind] = sorted(_parse_names(result.stdout, header))
+    return capabilities
+
+def _cache_key(ffmpeg):
+    path = os.path.realpath(shutil.which(ffmpeg) or ffmpeg)
+    return f"{path}:{os.stat(path).st_mtime_ns}"
+
+@lru_cache(maxsize=None)
+def capabilities():
+    ffmpeg = find_ffmpeg()
+    try:
+        key = _cache_key(ffmpeg)
+    except OSError:
+        key = None
+
+    cache = {}
+    if key:
+        try:
+            with open(CACHE_FILE, "r", encoding="utf-8") as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+        if key in cache:
+            return {kind: frozenset(names) for kind, names in cache[key].items()}
+
+    probed = _probe(ffmpeg)
+    if key:
+        cache = {k: v for k, v in cache.items() if not k.startswith(key.rsplit(":", 1)[0] + ":")}
+        cache[key] = probed
+        try:
+            os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+            with open(CACHE_FILE, "w", encoding="utf-8") as f:
+                json.dump(cache, f, indent=1)
+        except OSError as e:
+            print(f"WARNING: could not write ffmpeg capability cache: {e}")
+    return {kind: frozenset(names) for kind, names in probed.items()}
+
+def has_encoder(name):
+    return name in capabilities()["encoders"]
+
+def has_filter(name):
+    return name in capabilities()["filters"]
+
+def has_demuxer(name):
+    return name in capabilities()["demuxers"]
+
+def use_videotoolbox():
+    return platform.system() == "Darwin" and has_encoder("h264_videotoolbox")
+
+@lru_cache(maxsize=None)
+def resolve_encoder(name):
+    """Return name if ffmpeg has it, otherwise the first available fallback."""
+    candidates = [name]
+    for candidate in candidates:
+        for fallback in ENCODER_FALLBACKS.get(candidate, []):
+            if fallback not in candidates:
+                candidates.append(fallback)
+    for candidate in candidates:
+        if has_encoder(candidate):
+            if candidate != name:
+                print(f"WARNING: encoder '{name}' is not available, using '{candidate}'")
+            return candidate
+    raise RuntimeError(f"ffmpeg has no encoder for '{name}' (tried {', '.join(candidates)})")
+
+def run(cmd, quiet=False, timeout=None):
+    """Run a command with the ffmpeg concurrency limit and record how long it took."""
+    with _job_slots:
+        if not quiet:
+            print(f"Running: {' '.join(str(c) for c in cmd)}")
+        start = time.perf_counter()
+        try:
+            if quiet:
+                subprocess.run(cmd, check=True, timeout=timeout,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            else:
+                subprocess.run(cmd, check=True, timeout=timeout)
+        finally:
+            timings.append((cmd, time.perf_counter() - start))
+
+def run_ffmpeg(args, quiet=False, timeout=None):
+    """Run ffmpeg with the given arguments, the binary is prepended."""
+    run([find_ffmpeg(), *args], quiet=quiet, timeout=timeout)
+
+def print_timings():
+    """Summarize how long the ffmpeg runs of this process took."""
+    if not timings:
+        return
+    total = sum(seconds for _, seconds in timings)
+    slowest_cmd, slowest = max(timings, key=lambda t: t[1])
+    print(f"ffmpeg runs: {len(timings)}, total {total:.2f}s, mean {total / len(timings):.2f}s, "
+          f"slowest {slowest:.2f}s: {' '.join(str(c) for c in slowest_cmd)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the ffmpeg binary and capabilities the video tools will use.")
+    parser.add_argument("--refresh", action="store_true", help="Ignore the capability cache and probe again")
+    parser.add_argument("--encoder", action="append", default=[], help="Show which encoder would be used for this name")
+    args = parser.parse_args()
+
+    if args.refresh and os.path.exists(CACHE_FILE):
+        os.unlink(CACHE_FILE)
+
+    caps = capabilities()
+    print(f"ffmpeg: {find_ffmpeg()}")
+    for kind in ("encoders", "filters", "demuxers"):
+        print(f"{kind}: {len(caps[kind])}")
+    print(f"videotoolbox: {use_videotoolbox()}")
+    for name in args.encoder:
+        print(f"{name} -> {resolve_encoder(name)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Target harness runner for generated media.
+
+Runs a target command against every file in an output directory in parallel. Each run has a timeout and an optional
+memory limit. The runner records the exit code or signal and buckets crashes by a hash of the stderr/stack
+signature. The results are written next to the fuzz log, joined with the mutations that produced each file.
+"""
+
+import argparse
+import csv
+import fnmatch
+import hashlib
+import json
+import os
+import re
+import resource
+import shlex
+import shutil
+import signal
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+STDERR_LIMIT = 64 * 1024
+SIGNATURE_FRAMES = 5
+
+RESULTS_SUFFIX = "_results.csv"
+CRASHES_SUFFIX = "_crashes.json"
+
+# sanitizer and gdb style stack frames, e.g. "#3 0x55d0c in decode_frame libavcodec/h264.c:120"
+FRAME_RE = re.compile(r"^\s*#\d+\s+(?:0x[0-9a-fA-F]+\s+)?(?:in\s+)?(.*)$")
+ADDRESS_RE = re.compile(r"0x[0-9a-fA-F]+")
+NUMBER_RE = re.compile(r"\d+")
+
+def build_command(template, path):
+    """Split the template and put the file path in place of {input}, or at the end if there is no {input}."""
+    parts = shlex.split(template)
+    if not any("{input}" in part for part in parts):
+        return parts + [path]
+    return [part.replace("{input}", path) for part in parts]
+
+def limit_resources(memory_mb):
+    def preexec():
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+        if memory_mb:
+            limit = memory_mb << 20
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    return preexec
+
+def stderr_signature(stderr, status, returncode, path):
+    """Hash the top stack frames, or the tail of stderr when there is no stack, with file-specific details removed."""
+    text = stderr.decode("utf-8", errors="replace")
+    # decoders print the input name, which differs per file (and holds hex with --hash)
+    for name in (os.path.abspath(path), path, os.path.basename(path)):
+        text = text.replace(name, "INPUT")
+    lines = text.splitlines()
+    frames = [FRAME_RE.match(line).group(1) for line in lines if FRAME_RE.match(line)]
+    if frames:
+        key_lines = frames[:SIGNATURE_FRAMES]
+    else:
+        key_lines = [line for line in lines if line.strip()][-SIGNATURE_FRAMES:]
+    normalized = [NUMBER_RE.sub("N", ADDRESS_RE.sub("ADDR", line.strip())) for line in key_lines]
+    normalized.insert(0, f"{status}:{returncode}")
+    return hashlib.sha256("\n".join(normalized).encode("utf-8")).hexdigest()[:16]
+
+def run_target(path, args):
+    cmd = build_command(args.target, path)
+    start = time.perf_counter()
+    try:
+        proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                preexec_fn=limit_resources(args.memory_mb), start_new_session=True)
+    except OSError as e:
+        return {'filename': os.path.basename(path), 'status': 'error', 'returncode': '', 'signal': '',
+                'seconds': 0, 'signature': '', 'stderr': f"could not start target: {e}"}
+    try:
+        _, stderr = proc.communicate(timeout=args.timeout)
+        timed_out = False
+    except subprocess.TimeoutExpired:
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            # exited between the timeout and the kill
+            pass
+        _, stderr = proc.communicate()
+        timed_out = True
+    elapsed = time.perf_counter() - start
+    stderr = stderr[-STDERR_LIMIT:]
+
+    returncode = proc.returncode
+    signal_name = ''
+    if timed_out:
+        status = 'timeout'
+    elif returncode < 0:
+        status = 'crash'
+        try:
+            signal_name = signal.Signals(-returncode).name
+        except ValueError:
+            signal_name = str(-returncode)
+    elif returncode in args.crash_exit_codes:
+        status = 'crash'
+    elif returncode != 0:
+        status = 'error'
+    else:
+        status = 'ok'
+
+    signature = stderr_signature(stderr, status, returncode, path) if status == 'crash' else ''
+    return {'filename': os.path.basename(path), 'status': status, 'returncode': returncode,
+            'signal': signal_name, 'seconds': round(elapsed, 3), 'signature': signature,
+            'stderr': stderr.decode("utf-8", errors="replace")}
+
+def read_mutations(log_path):
+    """Map filename -> list of mutation descriptions from an mp4_datetime_fuzzer.py or scatter_bytes.py CSV log."""
+    mutations = {}
+    if not log_path or not os.path.exists(log_path):
+        return mutations
+    with open(log_path, newline='') as f:
+        reader = csv.DictReader(f)
+        if not reader.fieldnames or 'filename' not in reader.fieldnames:
+            print(f"WARNING: {log_path} has no filename column, mutations will not be reported")
+            return mutations
+        for row in reader:
+            if row['filename'] == 'DRY-RUN':
+                continue
+            change = f"{row.get('atom', '')}.{row.get('field', '')}@{row.get('offset', '')}={row.get('value', '')}"
+            mutations.setdefault(row['filename'], []).append(change)
+    return mutations
+
+def find_inputs(directory, pattern, exclude):
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if fnmatch.fnmatch(name, pattern) and name not in exclude
+                  and os.path.isfile(os.path.join(directory, name)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a target command against generated media and bucket crashes.")
+    parser.add_argument('--input', '-i', required=True, help='Directory of generated files')
+    parser.add_argument('--target', '-t', required=True,
+                        help="Target command, {input} is replaced by the file path (e.g., 'ffprobe -v error {input}')")
+    parser.add_argument('--log', help='Fuzz log from mp4_datetime_fuzzer.py or scatter_bytes.py, results are written next to it')
+    parser.add_argument('--pattern', default='*', help='Only run files matching this glob (default: *)')
+    parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count() or 1, help='Number of parallel runs')
+    parser.add_argument('--timeout', type=float, default=30, help='Seconds before a run is killed (default: 30)')
+    parser.add_argument('--memory-mb', type=int, default=0,
+                        help='Address space limit per run in MB, 0 for none (default: 0). '
+                             'Leave at 0 for sanitizer builds, which reserve terabytes of address space')
+    parser.add_argument('--crash-exit-codes', type=int, nargs='+', default=[],
+                        help='Exit codes that count as crashes, besides signals (e.g., 1 for sanitizer builds)')
+    args = parser.parse_args()
+
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    try:
+        target_parts = shlex.split(args.target)
+    except ValueError as e:
+        parser.error(f"invalid --target: {e}")
+    if not target_parts:
+        parser.error("--target is empty")
+    if not shutil.which(target_parts[0]):
+        parser.error(f"target program '{target_parts[0]}' not found or not executable")
+
+    if args.log:
+        base = os.path.splitext(args.log)[0]
+    else:
+        base = os.path.join(args.input, 'harness')
+    results_path = base + RESULTS_SUFFIX
+    crashes_path = base + CRASHES_SUFFIX
+
+    exclude = {os.path.basename(p) for p in (results_path, crashes_path, args.log or '')}
+    inputs = find_inputs(args.input, args.pattern, exclude)
+    if not inputs:
+        print("No input files found.")
+        return
+
+    mutations = read_mutations(args.log)
+    buckets = {}
+    counts = {}
+
+    with open(results_path, 'w', newline='') as results_file, ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        writer = csv.writer(results_file)
+        writer.writerow(['filename', 'status', 'returncode', 'signal', 'seconds', 'signature', 'mutations'])
+
+        # workers are single-threaded processes, so preexec_fn is safe to use when spawning the target
+        for idx, result in enumerate(pool.map(partial(run_target, args=args), inputs)):
+            changes = mutations.get(result['filename'], [])
+            writer.writerow([result['filename'], result['status'], result['returncode'], result['signal'],
+                             result['seconds'], result['signature'], ';'.join(changes)])
+            counts[result['status']] = counts.get(result['status'], 0) + 1
+
+            if result['status'] == 'crash':
+                bucket = buckets.setdefault(result['signature'], {
+                    'signature': result['signature'],
+                    'returncode': result['returncode'],
+                    'signal': result['signal'],
+                    'stderr': result['stderr'],
+                    'files': [],
+                })
+                bucket['files'].append({'filename': result['filename'], 'mutations': changes})
+                if len(bucket['files']) == 1:
+                    print(f"New crash {result['signature']} ({result['signal'] or result['returncode']}) "
+                          f"from {result['filename']}")
+            print(f"Completed file {idx + 1}/{len(inputs)}: {result['status']}")
+
+    with open(crashes_path, 'w', encoding='utf-8') as f:
+        json.dump(sorted(buckets.values(), key=lambda b: -len(b['files'])), f, indent=2)
+
+    summary = ', '.join(f"{status}={count}" for status, count in sorted(counts.items()))
+    print(f"{summary}, unique crashes={len(buckets)}")
+    print(f"Results written to {results_path} and {crashes_path}")
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 
+import sys
 import random
 import argparse
 
@@ -23,22 +24,71 @@ LOREM_WORDS = (
     "semper class lobortis cursus torquent sociis maecenas augue luctus sapien fusce"
 ).split()
 
+CAPITALIZED = {word: word.capitalize() for word in LOREM_WORDS}
+
+DEFAULT_BLOCK_SIZE = 1 << 20
+
 def generate_sentence(min_words=6, max_words=12):
     length = random.randint(min_words, max_words)
     words = random.choices(LOREM_WORDS, k=length)
     sentence = ' '.join(words).capitalize() + '.'
     return sentence
 
-def print_lorem_bytes(target_bytes, min_words=6, max_words=12):
+def generate_block(block_size, min_words=6, max_words=12, rng=random):
+    """Return roughly block_size bytes of sentences, one sentence per line."""
+    avg_word = sum(len(w) + 1 for w in LOREM_WORDS) / len(LOREM_WORDS)
+    avg_sentence = avg_word * (min_words + max_words) / 2 + 1
+    count = max(1, int(block_size / avg_sentence))
+
+    lengths = rng.choices(range(min_words, max_words + 1), k=count)
+    words = rng.choices(LOREM_WORDS, k=sum(lengths))
+
+    start = 0
+    for length in lengths:
+        words[start] = CAPITALIZED[words[start]]
+        start += length
+        words[start - 1] += '.\n'
+    return ' '.join(words).replace('\n ', '\n')
+
+def generate_lorem(target_bytes=None, min_words=6, max_words=12, exact=False,
+                   block_size=DEFAULT_BLOCK_SIZE, seed=None):
+    """
+    Lazily yield blocks of Lorem Ipsum text until target_bytes is reached.
+
+    The text is ASCII, so characters and UTF-8 bytes are the same count. Without exact, output stops at the last
+    whole sentence that fits. With exact, the final sentence is cut to hit target_bytes. A target_bytes of None
+    yields forever.
+    """
+    if min_words < 1 or max_words < min_words:
+        raise ValueError("need 1 <= min_words <= max_words")
+    rng = random.Random(seed) if seed is not None else random
+
+    remaining = target_bytes
+    while remaining is None or remaining > 0:
+        size = block_size if remaining is None else min(block_size, remaining + max_words * 16)
+        block = generate_block(size, min_words, max_words, rng)
+        if remaining is not None and len(block) >= remaining:
+            if not exact:
+                cut = block.rfind('\n', 0, remaining) + 1
+                if cut:
+                    yield block[:cut]
+                return
+            yield block[:remaining]
+            return
+        if remaining is not None:
+            remaining -= len(block)
+        yield block
+
+def write_lorem_bytes(out, target_bytes, min_words=6, max_words=12, exact=False,
+                      block_size=DEFAULT_BLOCK_SIZE, seed=None):
     total_bytes = 0
+    for block in generate_lorem(target_bytes, min_words, max_words, exact, block_size, seed):
+        total_bytes += out.write(block.encode('ascii'))
+    out.flush()
+    return total_bytes
 
-    while total_bytes < target_bytes:
-        sentence = generate_sentence(min_words, max_words)
-        candidate = sentence + ' '
-        if total_bytes + len(candidate.encode("utf-8")) > target_bytes:
-            break
-        print(candidate)
-        total_bytes += len(candidate.encode("utf-8"))
+def print_lorem_bytes(target_bytes, min_words=6, max_words=12, exact=False, seed=None):
+    return write_lorem_bytes(sys.stdout.buffer, target_bytes, min_words, max_words, exact, seed=seed)
 
 
 def main():
@@ -46,9 +96,22 @@ def main():
     parser.add_argument("-b", "--bytes", type=int, required=True, help="Desired output size in bytes")
     parser.add_argument("--min", type=int, default=6, help="Minimum words per sentence")
     parser.add_argument("--max", type=int, default=12, help="Maximum words per sentence")
+    parser.add_argument("--exact", action="store_true", help="Output exactly the requested number of bytes, cutting the last sentence")
+    parser.add_argument("--output", "-o", help="Write to this file instead of stdout")
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE, help="Bytes generated per block (default: 1 MiB)")
+    parser.add_argument("--seed", type=int, help="Random seed for reproducibility")
     args = parser.parse_args()
 
-    print_lorem_bytes(args.bytes, args.min, args.max)
+    if args.min < 1 or args.max < args.min:
+        parser.error("--min must be at least 1 and not greater than --max")
+    if args.block_size < 1:
+        parser.error("--block-size must be positive")
+
+    if args.output:
+        with open(args.output, "wb", buffering=args.block_size) as out:
+            write_lorem_bytes(out, args.bytes, args.min, args.max, args.exact, args.block_size, args.seed)
+    else:
+        write_lorem_bytes(sys.stdout.buffer, args.bytes, args.min, args.max, args.exact, args.block_size, args.seed)
 
 if __name__ == "__main__":
     main()
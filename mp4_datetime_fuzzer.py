@@ -15,6 +15,7 @@ import hashlib
 
 MP4_EPOCH = datetime.datetime(1904, 1, 1)
 
+# Same box walk as parse_boxes in scatter_bytes.py, keep the two in sync.
 def parse_atoms(f, start, end, atom_types, bit_depth, field_filter, positions):
     f.seek(start)
     while f.tell() < end:
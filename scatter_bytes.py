@@ -2,19 +2,120 @@
 import os
 import random
 import argparse
+import csv
+import struct
+from fnmatch import fnmatchcase
+
+# boxes whose payload is a plain list of child boxes
+CONTAINER_BOXES = [b'moov', b'trak', b'mdia', b'minf', b'stbl', b'edts', b'dinf',
+                   b'udta', b'mvex', b'moof', b'traf', b'mfra']
 
 def parse_byte_set(byte_strings):
     return bytes(int(b, 16) for b in byte_strings)
 
-def modify_file_randomly(path, byte_set, length, count, spacing):
+def parse_region(spec):
+    pattern, sep, weight = spec.rpartition("=")
+    if not sep:
+        return spec, 1.0
+    try:
+        value = float(weight)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid region weight in '{spec}'")
+    if value < 0:
+        raise argparse.ArgumentTypeError(f"region weight must not be negative in '{spec}'")
+    return pattern, value
+
+# Same box walk as parse_atoms in mp4_datetime_fuzzer.py, keep the two in sync. This one also handles size 0
+# (box runs to the end of the file) and descends into more container boxes.
+def parse_boxes(f, start, end, parent, boxes):
+    f.seek(start)
+    while f.tell() < end:
+        pos = f.tell()
+        header = f.read(8)
+        if len(header) < 8:
+            break
+        size, box_type = struct.unpack('>I4s', header)
+
+        if size == 1:
+            size_bytes = f.read(8)
+            if len(size_bytes) < 8:
+                break
+            size = struct.unpack('>Q', size_bytes)[0]
+            header_size = 16
+        elif size == 0:
+            size = end - pos
+            header_size = 8
+        else:
+            header_size = 8
+
+        if size < header_size or pos + size > end:
+            break
+
+        path = parent + box_type.decode('latin1')
+        boxes.append({'path': path, 'offset': pos, 'size': size})
+
+        if box_type in CONTAINER_BOXES:
+            parse_boxes(f, pos + header_size, pos + size, path + '/', boxes)
+
+        f.seek(pos + size)
+
+def find_boxes(path):
+    boxes = []
+    with open(path, 'rb') as f:
+        parse_boxes(f, 0, os.path.getsize(path), '', boxes)
+    return boxes
+
+def build_targets(path, regions):
+    """Resolve (pattern, weight) pairs to the boxes each pattern matches."""
+    boxes = find_boxes(path)
+    targets = []
+    for pattern, weight in regions:
+        matched = [box for box in boxes if fnmatchcase(box['path'], pattern)]
+        # '*' also matches '/', drop boxes inside another matched box so no byte is counted twice
+        matched_paths = {box['path'] for box in matched}
+        matched = [box for box in matched
+                   if not any(box['path'].startswith(parent + '/') for parent in matched_paths)]
+        if not matched:
+            print(f"WARNING: region '{pattern}' matched no boxes, ignoring")
+            continue
+        for box in matched:
+            # boxes nested in this one, in file order, to report the innermost box that was hit
+            end = box['offset'] + box['size']
+            box['inner'] = [b for b in boxes if b is not box and box['offset'] <= b['offset']
+                            and b['offset'] + b['size'] <= end]
+        if weight > 0:
+            targets.append((pattern, weight, matched))
+    return targets
+
+def pick_position(file_size, length, targets):
+    if not targets:
+        return random.randint(0, file_size - length), None
+
+    _, _, boxes = random.choices(targets, weights=[t[1] for t in targets])[0]
+    box = random.choices(boxes, weights=[b['size'] for b in boxes])[0]
+    last = box['offset'] + max(box['size'] - length, 0)
+    pos = min(random.randint(box['offset'], last), file_size - length)
+    hit = box
+    for inner in box['inner']:
+        if inner['offset'] <= pos < inner['offset'] + inner['size']:
+            hit = inner
+    return pos, hit['path']
+
+def modify_file_randomly(path, byte_set, length, count, spacing, targets=None, log_writer=None):
     file_size = os.path.getsize(path)
+    filename = os.path.basename(path)
     with open(path, "r+b") as f:
         for _ in range(count):
-            pos = random.randint(0, file_size - length)
+            pos, box_path = pick_position(file_size, length, targets)
             f.seek(pos)
             chunk = bytes(random.choice(byte_set) for _ in range(length))
             f.write(chunk)
-            print(f"Wrote {length} at position {pos}")
+            if log_writer:
+                log_writer.writerow([filename, box_path or '', 'bytes', pos, chunk.hex()])
+            if box_path:
+                print(f"Wrote {length} at position {pos} in {box_path}")
+            else:
+                print(f"Wrote {length} at position {pos}")
             if spacing > 0:
                 pos += spacing
 
@@ -25,10 +126,40 @@ def main():
     parser.add_argument("--length", type=int, default=1, help="Length of each modification in bytes")
     parser.add_argument("--count", type=int, default=100, help="Number of random modifications to perform")
     parser.add_argument("--spacing", type=int, default=0, help="Minimum number of bytes between modifications (optional)")
+    parser.add_argument("--region", type=parse_region, action="append", default=[], metavar="PATTERN[=WEIGHT]",
+                        help="Restrict modifications to MP4 boxes whose path matches PATTERN "
+                             "(e.g., 'moov/trak/mdia/minf/stbl/*=90' 'mdat=10'), may be repeated")
+    parser.add_argument("--list-boxes", action="store_true", help="Print the MP4 box tree of the file and exit")
+    parser.add_argument("--seed", type=int, help="Random seed for reproducibility")
+    parser.add_argument("--log", help="Append the modifications to this CSV file, readable by harness.py")
     args = parser.parse_args()
 
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    if args.list_boxes:
+        for box in find_boxes(args.file):
+            print(f"{box['offset']:>12} {box['size']:>12} {box['path']}")
+        return
+
+    targets = None
+    if args.region:
+        targets = build_targets(args.file, args.region)
+        if not targets:
+            parser.error("No MP4 boxes matched the requested regions.")
+
     byte_set = parse_byte_set(args.byte_set)
-    modify_file_randomly(args.file, byte_set, args.length, args.count, args.spacing)
+    if not args.log:
+        modify_file_randomly(args.file, byte_set, args.length, args.count, args.spacing, targets)
+        return
+
+    new_log = not os.path.exists(args.log) or os.path.getsize(args.log) == 0
+    with open(args.log, "a", newline="") as logfile:
+        writer = csv.writer(logfile)
+        if new_log:
+            # same column names as mp4_datetime_fuzzer.py, the box path goes in the atom column
+            writer.writerow(['filename', 'atom', 'field', 'offset', 'value'])
+        modify_file_randomly(args.file, byte_set, args.length, args.count, args.spacing, targets, writer)
 
 if __name__ == "__main__":
     main()
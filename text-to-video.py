@@ -1,7 +1,6 @@
 #!/usr/bin/env python3
 
 import subprocess
-import shlex
 import textwrap
 import argparse
 import tempfile
@@ -9,6 +8,8 @@ import os
 import sys
 import platform
 
+from ffmpeg_runner import find_ffmpeg, has_filter, resolve_encoder, run
+
 def generate_tts_audio(text):
     """Generate TTS audio and return the temporary filename."""
     system = platform.system()
@@ -75,11 +76,9 @@ def main():
     if not args.text:
         parser.error("No text provided.")
 
-    ffmpeg = "ffmpeg"
-    # homebrew has extra features we use in ffmpeg-full
-    ffmpeg_full = "/opt/homebrew/opt/ffmpeg-full/bin/ffmpeg"
-    if os.path.exists(ffmpeg_full):
-        ffmpeg = ffmpeg_full
+    ffmpeg = find_ffmpeg()
+    if not has_filter("drawtext"):
+        parser.error(f"{ffmpeg} does not have the drawtext filter, install an ffmpeg built with libfreetype (e.g. ffmpeg-full)")
 
     display_text = " ".join(args.text)
     tts_text = args.tts_text if args.tts_text else display_text
@@ -128,15 +127,15 @@ def main():
     # -----------------------
     if args.tts:
         tts_audio_path = generate_tts_audio(tts_text)
-        video_input = f"-f lavfi -i color=c={args.background}:s={width}x{height}:d={args.duration}"
-        audio_input = f"-i {shlex.quote(tts_audio_path)}"
-        subtitle_input = f"-f srt -i {shlex.quote(subtitle_path)}"
+        video_input = ["-f", "lavfi", "-i", f"color=c={args.background}:s={width}x{height}:d={args.duration}"]
+        audio_input = ["-i", tts_audio_path]
+        subtitle_input = ["-f", "srt", "-i", subtitle_path]
         video_map = "0:v"
         audio_map = "1:a"
     else:
-        video_input = f"-f lavfi -i color=c={args.background}:s={width}x{height}:d={args.duration}"
-        audio_input = f"-f lavfi -i anoisesrc=color=white:duration={args.duration}:sample_rate=44100"
-        subtitle_input = f"-f srt -i {shlex.quote(subtitle_path)}"
+        video_input = ["-f", "lavfi", "-i", f"color=c={args.background}:s={width}x{height}:d={args.duration}"]
+        audio_input = ["-f", "lavfi", "-i", f"anoisesrc=color=white:duration={args.duration}:sample_rate=44100"]
+        subtitle_input = ["-f", "srt", "-i", subtitle_path]
         video_map = "0:v"
         audio_map = "[a]"
 
@@ -148,20 +147,17 @@ def main():
     # -----------------------
     # Build and Run FFmpeg Command
     # -----------------------
-    command = f"""
-    {ffmpeg} -y {video_input} {audio_input} {subtitle_input} \
-    -filter_complex "{filter_complex}" \
-    -map "[v]" -map {audio_map} -map 2:s:0 \
-    -c:v libx264 -crf:v 20 -c:a aac -c:s mov_text \
-    -metadata:s:s:0 language={args.subtitle_language} \
-    {shlex.quote(args.output)}
-    """
-
-    print("Running command:")
-    print(command)
+    command = [
+        ffmpeg, "-y", *video_input, *audio_input, *subtitle_input,
+        "-filter_complex", filter_complex,
+        "-map", "[v]", "-map", audio_map, "-map", "2:s:0",
+        "-c:v", resolve_encoder("libx264"), "-crf:v", "20", "-c:a", "aac", "-c:s", "mov_text",
+        "-metadata:s:s:0", f"language={args.subtitle_language}",
+        args.output
+    ]
 
     try:
-        subprocess.run(command, shell=True, check=True)
+        run(command)
     finally:
         if args.tts:
             os.unlink(tts_audio_path)
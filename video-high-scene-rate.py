@@ -1,21 +1,14 @@
 #!/usr/bin/env python3
 
 import argparse
-import os
-import platform
-import subprocess
 import shutil
 import random
 from pathlib import Path
 from urllib.parse import unquote
 from itertools import cycle, islice
+from concurrent.futures import ThreadPoolExecutor
 
-def run(cmd, quiet=False):
-    if not quiet:
-        print(f"Running: {' '.join(str(c) for c in cmd)}")
-        subprocess.run(cmd, check=True)
-    else:
-        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+from ffmpeg_runner import MAX_JOBS, find_ffmpeg, print_timings, resolve_encoder, run, use_videotoolbox
 
 def timestamp(seconds):
     h = int(seconds // 3600)
@@ -55,13 +48,7 @@ def main():
     if args.height % 2 == 1:
         print("WARNING: height is not an even number, this may fail")
 
-    ffmpeg = "ffmpeg"
-    # homebrew has extra features we use in ffmpeg-full
-    ffmpeg_full = "/opt/homebrew/opt/ffmpeg-full/bin/ffmpeg"
-    if os.path.exists(ffmpeg_full):
-        ffmpeg = ffmpeg_full
-
-    use_videotoolbox = (platform.system() == "Darwin")
+    ffmpeg = find_ffmpeg()
 
     tmp_dir = Path("tmp_scenes")
     tmp_dir.mkdir(exist_ok=True)
@@ -83,8 +70,9 @@ def main():
         with args.image_list.open("r", encoding="utf-8") as f:
             image_files = [line.strip() for line in f if line.strip()]
 
+    # pick every scene up front, in order, so the random choices do not depend on thread timing
+    scene_commands = []
     for i in range(scene_count):
-        print(f"Generating scene {i + 1}/{scene_count}...")
         output_file = tmp_dir / f"scene_{i}.mp4"
         use_noise = use_image = use_color = False
 
@@ -102,19 +90,19 @@ def main():
             use_color = True
 
         if use_noise:
-            run([
+            scene_commands.append([
                 ffmpeg, "-y",
                 "-f", "lavfi", "-i", f"nullsrc=s={args.width}x{args.height}:d={duration}",
                 "-vf", f"noise=alls=100:allf=t+u,fps={args.frame_rate}",
                 "-preset", "veryfast",
                 str(output_file)
-            ], quiet=not args.verbose)
+            ])
         elif use_image:
             if args.shuffle_images:
                 image_path = image_files[random.randint(0, len(image_files)-1)]
             else:
                 image_path = image_files[i % len(image_files)]
-            run([
+            scene_commands.append([
                 ffmpeg, "-y",
                 "-loop", "1", "-i", image_path,
                 "-t", str(duration),
@@ -122,16 +110,24 @@ def main():
                 "-pix_fmt", "yuv420p",
                 "-preset", "veryfast",
                 str(output_file)
-            ], quiet=not args.verbose)
+            ])
         else:  # elif use_color:
             color = colors[i % len(colors)]
-            run([
+            scene_commands.append([
                 ffmpeg, "-y",
                 "-f", "lavfi", "-i", f"color=c={color}:s={args.width}x{args.height}:d={duration}",
                 "-vf", f"fps={args.frame_rate}",
                 "-preset", "veryfast",
                 str(output_file)
-            ], quiet=not args.verbose)
+            ])
+
+    def generate_scene(i):
+        print(f"Generating scene {i + 1}/{scene_count}...")
+        run(scene_commands[i], quiet=not args.verbose)
+
+    # run() holds the ffmpeg job limit, the pool only needs as many threads as there are slots
+    with ThreadPoolExecutor(max_workers=MAX_JOBS) as pool:
+        list(pool.map(generate_scene, range(scene_count)))
 
     concat_file = tmp_dir / "inputs.txt"
     with concat_file.open("w") as f:
@@ -154,7 +150,7 @@ def main():
             str(audio_file)
         ], quiet=not args.verbose)
 
-    if use_videotoolbox:
+    if use_videotoolbox():
         codec_map = {
             "h264": "h264_videotoolbox",
             "h265": "hevc_videotoolbox"
@@ -164,12 +160,11 @@ def main():
             "h264": "libx264",
             "h265": "libx265"
         }
-    codec = codec_map[args.codec]
+    codec = resolve_encoder(codec_map[args.codec])
 
     x265_extra_params = []
-    if args.codec == "h265" and (args.width > 8192 or args.height > 4320):
-        if not use_videotoolbox:
-            x265_extra_params = ["-x265-params", "level-idc=6.2"]
+    if codec == "libx265" and (args.width > 8192 or args.height > 4320):
+        x265_extra_params = ["-x265-params", "level-idc=6.2"]
 
     ffmpeg_cmd = [
         ffmpeg, "-y",
@@ -211,7 +206,7 @@ def main():
         "-pix_fmt", "yuv420p"
     ]
 
-    if args.codec == "h265":
+    if codec in ("libx265", "hevc_videotoolbox"):
         ffmpeg_cmd += ["-tag:v", "hvc1"]
 
     if args.add_audio:
@@ -222,6 +217,9 @@ def main():
 
     shutil.rmtree(tmp_dir)
 
+    if args.verbose:
+        print_timings()
+
 if __name__ == "__main__":
     main()
 